@@ -2,16 +2,53 @@ import pandas as pd
 import numpy as np
 from fastapi import FastAPI, Query, HTTPException
 import json
+import glob
+import io
+import os
+import re
+from datetime import date
 from typing import Optional, List, Literal
 
 # --- 1. DUPLIKASI LOGIKA PEMBERSIHAN DATA ---
-def get_clean_data_for_api(file_path):
+# Kombinasi kolom yang mengidentifikasi satu game saat membandingkan dua snapshot (/changes).
+SNAPSHOT_KEY_COLS = ['title', 'console', 'publisher', 'developer', 'release_date']
+SALES_COLS = ['total_sales', 'na_sales', 'jp_sales', 'pal_sales', 'other_sales']
+
+def read_dump_lines(file_path):
+    """
+    Membaca dump CSV sebagai teks: (header, array baris data, kunci baris).
+    Kunci baris adalah hash isi baris mentah, sehingga baris yang tidak berubah antar dump
+    bisa dikenali tanpa mem-parse CSV. Baris yang identik dibedakan dengan urutan kemunculannya.
+    """
     try:
-        df = pd.read_csv(file_path)
+        with open(file_path, encoding='utf-8') as f:
+            text = f.read()
     except FileNotFoundError:
         print(f"Error: File '{file_path}' tidak ditemukan.")
         return None
-    
+
+    lines = [line for line in text.replace('\r\n', '\n').split('\n') if line]
+    header = lines[0] if lines else ''
+    rows = np.array(lines[1:], dtype=object)
+
+    row_keys = pd.util.hash_array(rows, categorize=False)
+    if pd.Index(row_keys).has_duplicates:
+        occurrence = pd.Series(row_keys).groupby(row_keys).cumcount().to_numpy().astype(np.uint64)
+        row_keys = row_keys ^ (occurrence * np.uint64(0x9E3779B97F4A7C15))
+    return header, rows, pd.Index(row_keys)
+
+def parse_dump_rows(header, rows, row_keys):
+    """
+    Mem-parse baris CSV menjadi DataFrame ber-index kunci baris.
+    Mengembalikan None jika baris tidak sama dengan record CSV (misal ada field berisi baris baru).
+    """
+    df = pd.read_csv(io.StringIO('\n'.join([header, *rows])))
+    if len(df) != len(rows):
+        return None
+    df.index = row_keys
+    return df
+
+def clean_game_rows(df):
     df_clean = df.dropna(subset=['total_sales']).copy()
     df_clean['release_date'] = pd.to_datetime(df_clean['release_date'])
     df_clean['release_year'] = df_clean['release_date'].dt.year
@@ -36,21 +73,145 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# --- 3. Memuat Data Saat Startup ---
+# --- 3. Penyimpanan Snapshot & Ingest Delta ---
+BASE_DUMP_FILE = "vgchartz-2024.csv"
+DUMP_DIR = "dumps"  # Dump lanjutan, diurutkan berdasarkan nama file (misal: vgchartz-2025-01-31.csv)
+MAX_SNAPSHOTS = 5
+
+# as_of (date) -> {"as_of", "header", "row_keys", "df", "stats_parts"}
+snapshots = {}
+unique_genres = []
+unique_consoles = []
+
+def compute_stats_parts(df):
+    """
+    Komponen /stats untuk satu snapshot, dihitung sekali saat ingest.
+    """
+    return {
+        "game_count": len(df),
+        # Dibulatkan agar hasilnya tidak bergantung pada urutan baris (delta vs. muat penuh)
+        "sales_sum": round(float(df['total_sales'].sum()), 6),
+        "score_sum": round(float(df['critic_score'].sum()), 6),
+        "score_count": int(df['critic_score'].count()),
+    }
+
+def snapshot_date_from_file_name(file_path):
+    """
+    Mengambil tanggal snapshot (YYYY-MM-DD) dari nama file dump, atau None jika tidak ada.
+    """
+    match = re.search(r"(\d{4}-\d{2}-\d{2})", os.path.basename(file_path))
+    if match is None:
+        return None
+    try:
+        return date.fromisoformat(match.group(1))
+    except ValueError:
+        return None
+
+def ingest_snapshot(file_path, as_of=None):
+    """
+    Memuat dump baru sebagai delta terhadap snapshot terakhir.
+    Baris mentah yang sudah ada di dump sebelumnya (termasuk yang terbuang saat pembersihan)
+    tidak di-parse ulang; hanya baris baru/berubah yang di-parse dan dibersihkan, dan baris yang
+    hilang dari dump dihapus. Tanggal snapshot diambil dari `as_of` atau nama file; hanya snapshot
+    pertama yang boleh memakai `last_update` terbaru sebagai tanggal.
+    """
+    global unique_genres, unique_consoles
+
+    prev = snapshots[max(snapshots)] if snapshots else None
+    if as_of is None:
+        as_of = snapshot_date_from_file_name(file_path)
+    if as_of is None and prev is not None:
+        print(f"Error: Tanggal snapshot untuk '{file_path}' tidak diketahui (gunakan nama file vgchartz-YYYY-MM-DD.csv).")
+        return None
+    if as_of in snapshots:
+        print(f"Error: Snapshot {as_of} sudah ada; dump '{file_path}' dilewati.")
+        return None
+    if prev is not None and as_of < prev['as_of']:
+        print(f"Error: Dump '{file_path}' ({as_of}) lebih lama dari snapshot terakhir ({prev['as_of']}).")
+        return None
+
+    dump = read_dump_lines(file_path)
+    if dump is None:
+        return None
+    header, rows, row_keys = dump
+
+    df = None
+    if prev is not None and prev['row_keys'] is not None and prev['header'] == header:
+        is_new = ~row_keys.isin(prev['row_keys'])
+        new_raw = parse_dump_rows(header, rows[is_new], row_keys[is_new])
+        if new_raw is not None:
+            prev_df = prev['df']
+            is_kept = prev_df.index.isin(row_keys)
+            delta = clean_game_rows(new_raw)
+            df = prev_df if is_kept.all() else prev_df[is_kept]
+            if not delta.empty:
+                df = pd.concat([df, delta])
+            load_note = f"{int(is_new.sum())} baris baru/berubah, {int((~is_kept).sum())} baris dihapus"
+
+    if df is None:
+        raw = parse_dump_rows(header, rows, row_keys)
+        if raw is None:
+            # Baris teks tidak bisa dipetakan ke record; muat penuh tanpa kunci baris
+            raw = pd.read_csv(file_path)
+            row_keys = None
+        if as_of is None:
+            watermark = pd.to_datetime(raw['last_update'], errors='coerce').max()
+            if pd.isna(watermark):
+                print(f"Error: Tanggal snapshot untuk '{file_path}' tidak diketahui (gunakan nama file vgchartz-YYYY-MM-DD.csv).")
+                return None
+            as_of = watermark.date()
+        df = clean_game_rows(raw)
+        load_note = "dimuat penuh"
+
+    snapshots[as_of] = {
+        "as_of": as_of,
+        "header": header,
+        "row_keys": row_keys,
+        "df": df,
+        # Dihitung ulang dari df agar tidak ada galat pembulatan yang menumpuk antar snapshot
+        "stats_parts": compute_stats_parts(df),
+    }
+    for old_date in sorted(snapshots)[:-MAX_SNAPSHOTS]:
+        del snapshots[old_date]
+
+    unique_genres = sorted(df['genre'].unique().tolist())
+    unique_consoles = sorted(df['console'].unique().tolist())
+    print(f"Snapshot {as_of} dimuat dari '{file_path}' ({load_note}).")
+    return snapshots[as_of]
+
+def get_snapshot(as_of=None):
+    """
+    Mengambil snapshot terbaru yang tanggalnya <= `as_of` (atau snapshot terbaru jika None).
+    """
+    if not snapshots:
+        raise HTTPException(status_code=503, detail="Data tidak tersedia.")
+    if as_of is None:
+        return snapshots[max(snapshots)]
+    eligible = [d for d in snapshots if d <= as_of]
+    if not eligible:
+        raise HTTPException(status_code=404, detail=f"Tidak ada snapshot pada atau sebelum {as_of}.")
+    return snapshots[max(eligible)]
+
+# --- Memuat Data Saat Startup ---
 print("Memuat dan membersihkan data untuk API...")
 try:
-    df_clean = get_clean_data_for_api("vgchartz-2024.csv")
-    if df_clean is None:
-        raise RuntimeError("Gagal memuat file CSV. Pastikan 'vgchartz-2024.csv' ada.")
-    unique_genres = sorted(df_clean['genre'].unique().tolist())
-    unique_consoles = sorted(df_clean['console'].unique().tolist())
+    if ingest_snapshot(BASE_DUMP_FILE) is None:
+        raise RuntimeError(f"Gagal memuat file CSV. Pastikan '{BASE_DUMP_FILE}' ada.")
     print("Data berhasil dimuat dan dibersihkan untuk API.")
 except Exception as e:
     print(f"FATAL ERROR saat startup: {e}")
-    df_clean = pd.DataFrame() 
+    snapshots.clear()
     unique_genres = []
     unique_consoles = []
 
+# Dump lanjutan yang rusak hanya dilewati; snapshot yang sudah dimuat tetap dipakai
+if snapshots:
+    for dump_file in sorted(glob.glob(os.path.join(DUMP_DIR, "*.csv"))):
+        try:
+            ingest_snapshot(dump_file)
+        except Exception as e:
+            print(f"Error: Gagal memuat dump '{dump_file}', dilewati: {e}")
+
 # --- 4. Mendefinisikan Endpoint (URL Sederhana) ---
 
 @app.get("/")
@@ -77,16 +238,19 @@ def get_consoles():
 
 # --- PERUBAHAN: Endpoint Stats/KPI ---
 @app.get("/stats")
-def get_global_stats():
+def get_global_stats(
+    as_of: Optional[date] = Query(None, description="Tanggal snapshot (YYYY-MM-DD). Default: snapshot terbaru."),
+):
     """
     Mendapatkan statistik/KPI global dari seluruh dataset yang bersih.
     """
-    if df_clean.empty:
-        raise HTTPException(status_code=503, detail="Data tidak tersedia.")
+    snapshot = get_snapshot(as_of)
+    parts = snapshot['stats_parts']
     stats = {
-        "total_games_in_dataset": len(df_clean),
-        "total_global_sales_miliar": (df_clean['total_sales'].sum() / 1000),
-        "average_critic_score": df_clean['critic_score'].mean(),
+        "snapshot_date": snapshot['as_of'].isoformat(),
+        "total_games_in_dataset": parts['game_count'],
+        "total_global_sales_miliar": (parts['sales_sum'] / 1000),
+        "average_critic_score": (parts['score_sum'] / parts['score_count']) if parts['score_count'] else None,
     }
     return stats
 
@@ -103,15 +267,14 @@ def get_filtered_games(
     sort_by: Optional[str] = Query("total_sales", description="Kolom untuk mengurutkan (misal: 'total_sales', 'critic_score', 'release_year')"),
     ascending: bool = Query(False, description="Urutkan secara ascending (True) atau descending (False)"),
     skip: int = Query(0, description="Jumlah data untuk dilewati (pagination).", ge=0),
-    limit: int = Query(100, description="Jumlah data maksimum untuk ditampilkan (pagination).", ge=1, le=1000)
+    limit: int = Query(100, description="Jumlah data maksimum untuk ditampilkan (pagination).", ge=1, le=1000),
+    as_of: Optional[date] = Query(None, description="Tanggal snapshot (YYYY-MM-DD). Default: snapshot terbaru.")
 ):
     """
     Endpoint utama untuk mendapatkan data game dengan filter canggih.
     """
-    if df_clean.empty:
-        raise HTTPException(status_code=503, detail="Data tidak tersedia.")
-
-    temp_df = df_clean.copy()
+    snapshot = get_snapshot(as_of)
+    temp_df = snapshot['df'].copy()
     
     # Terapkan Filter
     if genres:
@@ -144,6 +307,7 @@ def get_filtered_games(
     result = safe_df_to_response(paginated_df)
     
     return {
+        "snapshot_date": snapshot['as_of'].isoformat(),
         "total_matches_before_pagination": total_matches,
         "showing_results": len(result),
         "skip": skip,
@@ -167,17 +331,16 @@ def get_summary_by_group(
     max_year: Optional[int] = Query(None, description="Tahun rilis maksimum.", le=2025),
     min_score: Optional[float] = Query(None, description="Skor kritikus minimum (0.0-10.0).", ge=0.0, le=10.0),
     max_score: Optional[float] = Query(None, description="Skor kritikus maksimum (0.0-10.0).", ge=0.0, le=10.0),
-    search_query: Optional[str] = Query(None, description="Cari teks di dalam judul game.", min_length=3)
+    search_query: Optional[str] = Query(None, description="Cari teks di dalam judul game.", min_length=3),
+    as_of: Optional[date] = Query(None, description="Tanggal snapshot (YYYY-MM-DD). Default: snapshot terbaru.")
 ):
     """
     Endpoint canggih untuk mendapatkan data agregat (ringkasan) 
     yang sudah di-groupby dan di-sum. Sangat cepat untuk membuat grafik.
     """
-    if df_clean.empty:
-        raise HTTPException(status_code=503, detail="Data tidak tersedia.")
-
-    # 1. Mulai dengan salinan data bersih
-    temp_df = df_clean.copy()
+    # 1. Mulai dengan salinan data bersih dari snapshot yang diminta
+    snapshot = get_snapshot(as_of)
+    temp_df = snapshot['df'].copy()
     
     # 2. Terapkan Filter
     if genres:
@@ -199,6 +362,8 @@ def get_summary_by_group(
         return {"message": "Tidak ada data yang cocok dengan filter Anda."}
 
     # 3. --- INTI AGREGRASI ---
+    # Sengaja dihitung per request (tidak disimpan per snapshot): filter & group_by bebas,
+    # dan groupby pada satu snapshot jauh lebih murah daripada menjaga jumlah per kelompok tetap sinkron.
     if group_by == 'release_year':
         temp_df = temp_df[temp_df['release_year'] > 1970]
 
@@ -221,7 +386,90 @@ def get_summary_by_group(
     result = safe_df_to_response(summary_df)
     
     return {
+        "snapshot_date": snapshot['as_of'].isoformat(),
         "group_by_column": group_by,
         "total_groups": len(result),
         "data": result
-    }
\ No newline at end of file
+    }
+
+# --- Endpoint Snapshot & Perubahan Penjualan ---
+@app.get("/snapshots")
+def get_snapshots():
+    """
+    Mendapatkan daftar tanggal snapshot yang bisa dipakai sebagai `as_of`.
+    """
+    return {"snapshots": [d.isoformat() for d in sorted(snapshots)]}
+
+def sales_by_game(df):
+    """
+    Menjumlahkan penjualan per game (SNAPSHOT_KEY_COLS), sehingga baris kembar
+    dibandingkan sebagai satu kelompok, tidak bergantung pada urutannya di dump.
+    """
+    game_keys = pd.util.hash_pandas_object(df[SNAPSHOT_KEY_COLS], index=False).to_numpy()
+    grouped = df.groupby(game_keys)
+    return grouped[['title', 'console', 'publisher']].first().join(grouped[SALES_COLS].sum())
+
+@app.get("/changes")
+def get_sales_changes(
+    from_date: Optional[date] = Query(None, description="Snapshot awal (YYYY-MM-DD). Default: snapshot sebelum `to_date`."),
+    to_date: Optional[date] = Query(None, description="Snapshot akhir (YYYY-MM-DD). Default: snapshot terbaru."),
+    skip: int = Query(0, description="Jumlah data untuk dilewati (pagination).", ge=0),
+    limit: int = Query(100, description="Jumlah data maksimum untuk ditampilkan (pagination).", ge=1, le=1000)
+):
+    """
+    Mendapatkan pergerakan penjualan per game di antara dua snapshot,
+    diurutkan dari perubahan total_sales terbesar.
+    """
+    end = get_snapshot(to_date)
+    if from_date is None:
+        earlier = [d for d in snapshots if d < end['as_of']]
+        if not earlier:
+            raise HTTPException(status_code=404, detail="Belum ada snapshot sebelumnya untuk dibandingkan.")
+        start = snapshots[max(earlier)]
+    else:
+        start = get_snapshot(from_date)
+    if start['as_of'] > end['as_of']:
+        raise HTTPException(status_code=400, detail=f"Snapshot awal ({start['as_of']}) lebih baru dari snapshot akhir ({end['as_of']}).")
+
+    before_df = sales_by_game(start['df'])
+    after_df = sales_by_game(end['df'])
+    movement = after_df[SALES_COLS].sub(before_df[SALES_COLS], fill_value=0).round(6)
+    movement = movement[(movement != 0).any(axis=1)]
+
+    if movement.empty:
+        return {
+            "from_date": start['as_of'].isoformat(),
+            "to_date": end['as_of'].isoformat(),
+            "total_changed_games": 0,
+            "message": "Tidak ada perubahan penjualan di antara kedua snapshot."
+        }
+
+    keys = movement.index
+    identity_cols = ['title', 'console', 'publisher']
+    identity = after_df[identity_cols].reindex(keys).combine_first(before_df[identity_cols].reindex(keys))
+
+    in_before = keys.isin(before_df.index)
+    in_after = keys.isin(after_df.index)
+    changes_df = identity.copy()
+    changes_df['status'] = np.where(~in_before, 'added', np.where(~in_after, 'removed', 'changed'))
+    changes_df['total_sales_before'] = before_df['total_sales'].reindex(keys).fillna(0)
+    changes_df['total_sales_after'] = after_df['total_sales'].reindex(keys).fillna(0)
+    for col in SALES_COLS:
+        changes_df[f'{col}_change'] = movement[col]
+
+    changes_df = changes_df.sort_values(by='total_sales_change', key=lambda s: s.abs(), ascending=False)
+
+    total_changed = len(changes_df)
+    paginated_df = changes_df.iloc[skip : skip + limit]
+    result = safe_df_to_response(paginated_df)
+
+    return {
+        "from_date": start['as_of'].isoformat(),
+        "to_date": end['as_of'].isoformat(),
+        "total_changed_games": total_changed,
+        "net_total_sales_change": float(movement['total_sales'].sum()),
+        "showing_results": len(result),
+        "skip": skip,
+        "limit": limit,
+        "data": result
+    }
@@ -0,0 +1,158 @@
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+
+COLUMNS = [
+    'img', 'title', 'console', 'genre', 'publisher', 'developer', 'critic_score',
+    'total_sales', 'na_sales', 'jp_sales', 'pal_sales', 'other_sales',
+    'release_date', 'last_update',
+]
+
+def make_row(title, total_sales, last_update, critic_score=8.0):
+    return ['/img', title, 'PS4', 'Action', 'Pub', 'Dev', critic_score,
+            total_sales, total_sales, 0.0, 0.0, 0.0, '2015-01-01', last_update]
+
+def write_dump(path, rows):
+    pd.DataFrame(rows, columns=COLUMNS).to_csv(path, index=False)
+    return str(path)
+
+@pytest.fixture
+def client():
+    api.snapshots.clear()
+    yield TestClient(api.app)
+    api.snapshots.clear()
+
+@pytest.fixture
+def two_snapshots(tmp_path, client):
+    base = write_dump(tmp_path / "vgchartz-2024.csv", [
+        make_row("Unchanged", 1.0, "2024-01-10"),
+        make_row("NoDate", 2.0, None),
+        make_row("SameDay", 3.0, "2024-01-10"),
+        make_row("Updated", 4.0, "2024-01-05"),
+        make_row("Removed", 5.0, "2024-01-01"),
+    ])
+    dump = write_dump(tmp_path / "vgchartz-2024-02-01.csv", [
+        make_row("Unchanged", 1.0, "2024-01-10"),
+        make_row("NoDate", 5.0, None),
+        make_row("SameDay", 9.0, "2024-01-10"),
+        make_row("Updated", 6.0, "2024-01-20", critic_score=0.0),
+        make_row("Added", 7.0, "2024-01-25"),
+    ])
+    assert api.ingest_snapshot(base) is not None
+    assert api.ingest_snapshot(dump) is not None
+    return base, dump
+
+def sales_by_title(response):
+    return {row['title']: row['total_sales'] for row in response.json()['data']}
+
+def test_delta_ingest_matches_dump(client, two_snapshots):
+    response = client.get("/games")
+    assert response.json()['snapshot_date'] == "2024-02-01"
+    assert sales_by_title(response) == {
+        "Unchanged": 1.0, "NoDate": 5.0, "SameDay": 9.0, "Updated": 6.0, "Added": 7.0,
+    }
+
+def test_as_of_serves_older_snapshot(client, two_snapshots):
+    response = client.get("/games", params={"as_of": "2024-01-31"})
+    assert response.json()['snapshot_date'] == "2024-01-10"
+    assert sales_by_title(response)["Removed"] == 5.0
+
+def test_incremental_stats_match_full_rebuild(client, two_snapshots):
+    _, dump = two_snapshots
+    expected = api.compute_stats_parts(api.clean_game_rows(pd.read_csv(dump)))
+    assert api.get_snapshot()['stats_parts'] == expected
+
+def test_stats_stay_exact_across_several_dumps(tmp_path, client):
+    sales = {f"Game {i}": round(0.1 * i, 2) for i in range(1, 20)}
+    base = write_dump(tmp_path / "vgchartz-2024.csv",
+                      [make_row(title, value, "2024-01-01") for title, value in sales.items()])
+    api.ingest_snapshot(base)
+    for day in range(1, 6):
+        for i, title in enumerate(sales):
+            if i % day == 0:
+                sales[title] = round(sales[title] + 0.07, 2)
+        dump = write_dump(tmp_path / f"vgchartz-2024-02-0{day}.csv",
+                          [make_row(title, value, None) for title, value in sales.items()])
+        assert api.ingest_snapshot(dump) is not None
+        expected = api.compute_stats_parts(api.clean_game_rows(pd.read_csv(dump)))
+        assert api.get_snapshot()['stats_parts'] == expected
+
+def test_changes_between_snapshots(client, two_snapshots):
+    data = client.get("/changes").json()
+    statuses = {row['title']: (row['status'], row['total_sales_change']) for row in data['data']}
+    assert statuses == {
+        "NoDate": ("changed", 3.0),
+        "SameDay": ("changed", 6.0),
+        "Updated": ("changed", 2.0),
+        "Added": ("added", 7.0),
+        "Removed": ("removed", -5.0),
+    }
+
+def test_changes_rejects_reversed_range(client, two_snapshots):
+    response = client.get("/changes", params={"from_date": "2024-02-01", "to_date": "2024-01-10"})
+    assert response.status_code == 400
+
+def test_duplicate_snapshot_date_is_skipped(tmp_path, client, two_snapshots):
+    other = write_dump(tmp_path / "vgchartz-2024-02-01-retry.csv", [make_row("Unchanged", 1.0, "2024-01-10")])
+    assert api.ingest_snapshot(other) is None
+    assert sales_by_title(client.get("/games"))["Added"] == 7.0
+
+def test_duplicate_keys_are_all_served(tmp_path, client):
+    base = write_dump(tmp_path / "vgchartz-2024.csv", [
+        make_row("Twin", 1.0, "2024-01-10"),
+        make_row("Twin", 2.0, "2024-01-10"),
+    ])
+    api.ingest_snapshot(base)
+    assert client.get("/stats").json()['total_games_in_dataset'] == 2
+
+def test_reordered_twin_rows_follow_the_dump(tmp_path, client):
+    base = write_dump(tmp_path / "vgchartz-2024.csv", [
+        make_row("Twin", 1.0, "2024-01-01"),
+        make_row("Twin", 2.0, "2024-01-02"),
+        make_row("Other", 3.0, "2024-01-10"),
+    ])
+    dump = write_dump(tmp_path / "vgchartz-2024-02-01.csv", [
+        make_row("Twin", 5.0, "2024-01-20"),
+        make_row("Twin", 1.0, "2024-01-01"),
+        make_row("Other", 3.0, "2024-01-10"),
+    ])
+    api.ingest_snapshot(base)
+    api.ingest_snapshot(dump)
+    twins = [row['total_sales'] for row in client.get("/games").json()['data'] if row['title'] == "Twin"]
+    assert sorted(twins) == [1.0, 5.0]
+
+    data = client.get("/changes").json()['data']
+    assert [(row['title'], row['status'], row['total_sales_change']) for row in data] == [("Twin", "changed", 3.0)]
+
+def test_rows_without_sales_are_picked_up_once_they_have_sales(tmp_path, client):
+    base = write_dump(tmp_path / "vgchartz-2024.csv", [
+        make_row("Listed", 1.0, "2024-01-01"),
+        make_row("Pending", None, "2024-01-01"),
+    ])
+    unchanged = write_dump(tmp_path / "vgchartz-2024-02-01.csv", [
+        make_row("Listed", 1.0, "2024-01-01"),
+        make_row("Pending", None, "2024-01-01"),
+    ])
+    released = write_dump(tmp_path / "vgchartz-2024-03-01.csv", [
+        make_row("Listed", 1.0, "2024-01-01"),
+        make_row("Pending", 4.0, None),
+    ])
+    for path in (base, unchanged, released):
+        api.ingest_snapshot(path)
+    assert sales_by_title(client.get("/games", params={"as_of": "2024-02-01"})) == {"Listed": 1.0}
+    assert sales_by_title(client.get("/games")) == {"Listed": 1.0, "Pending": 4.0}
+
+def test_multiline_fields_fall_back_to_full_load(tmp_path, client):
+    base = write_dump(tmp_path / "vgchartz-2024.csv", [
+        make_row("Line\nBreak", 1.0, "2024-01-01"),
+        make_row("Plain", 2.0, "2024-01-01"),
+    ])
+    dump = write_dump(tmp_path / "vgchartz-2024-02-01.csv", [
+        make_row("Line\nBreak", 3.0, "2024-01-20"),
+        make_row("Plain", 2.0, "2024-01-01"),
+    ])
+    api.ingest_snapshot(base)
+    api.ingest_snapshot(dump)
+    assert sales_by_title(client.get("/games")) == {"Line\nBreak": 3.0, "Plain": 2.0}